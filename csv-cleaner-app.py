@@ -1,12 +1,34 @@
-import os, re, io, gc, tempfile
+import os, re, io, gc, csv, queue, shutil, hashlib, tempfile, threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
 import tldextract
 import streamlit as st
-from zipfile import ZipFile
+from zipfile import ZipFile, ZIP_STORED, ZIP_DEFLATED
 from datetime import datetime
 
 
 CHUNK_SIZE = 50000  # split threshold
+OUTPUT_BUFFER_BUDGET = 500 << 20  # past this many buffered bytes, stream to disk instead
+
+# Hot-path patterns, compiled once at import
+_WS = re.compile(r"\s+")
+_NON_DIGIT = re.compile(r"\D+")
+_QUOTE_WS = re.compile(r"[\"'\s]")
+_EMAIL_PREFIX = re.compile(r"^email[:\-]*")
+
+# Column-name classifiers, shared by every header/column scan
+_EMAIL_COL_RE = re.compile(r"email")
+_PHONE_COL_RE = re.compile(r"phone")
+_DOMAIN_COL_RE = re.compile(r"domain|website|url")
+
+# Fast path for host extraction; tldextract reduces anything with subdomains
+_DOMAIN_RE = re.compile(r"(?:https?://)?(?:www\.)?([a-z0-9-]+\.[a-z.]{2,})", re.I)
+_PLAIN_HOST_RE = re.compile(r"^[a-z0-9-]+\.[a-z]{2,}$")  # already a registered domain
 
 
 # ============================================================
@@ -22,45 +44,45 @@ def save_uploaded_to_disk(uploaded_file):
 
 
 # ============================================================
-# CASE-INSENSITIVE COLUMN FINDER
+# CLEANING HELPERS (vectorized, one pass per column)
 # ============================================================
-def find_col(df, patterns):
-    for col in df.columns:
-        lc = col.lower()
-        for p in patterns:
-            if p in lc:
-                return col
-    return None
+def clean_email(s):
+    s = s.astype("string")
+    return s.str.strip().str.lower().str.replace(_WS, "", regex=True)
 
+def clean_phone(s):
+    s = s.astype("string")
+    return s.str.replace(_NON_DIGIT, "", regex=True)
 
-# ============================================================
-# CLEANING HELPERS
-# ============================================================
-def clean_email(email):
-    if pd.isna(email): return None
-    e = str(email).strip().lower()
-    return re.sub(r"\s+", "", e)
-
-def clean_phone(phone):
-    if pd.isna(phone): return None
-    return re.sub(r"\D", "", str(phone))
-
-def clean_domain(value):
-    if pd.isna(value): return None
-    ext = tldextract.extract(str(value).strip().lower())
+def _tldextract_domain(value):
+    ext = tldextract.extract(value)
     if not ext.domain: return None
     return f"{ext.domain}.{ext.suffix}"
 
+def clean_domain(s):
+    s = s.astype("string").str.strip().str.lower()
+    out = s.str.extract(_DOMAIN_RE, expand=False)
+    residual = s.notna() & out.isna()
+    if residual.any():
+        out[residual] = s[residual].map(_tldextract_domain)
+    # Collapse subdomains so blog.example.com matches suppression example.com.
+    # Two-label hosts are already registered domains; everything else pays a
+    # tldextract call, once per distinct host rather than per row.
+    deep = out.notna() & ~out.str.match(_PLAIN_HOST_RE, na=False)
+    if deep.any():
+        codes, uniques = pd.factorize(out[deep], sort=False)
+        reduced = np.array([_tldextract_domain(u) for u in uniques], dtype=object)
+        out[deep] = reduced[codes]
+    return out
+
 
 # ============================================================
 # NORMALIZE SUPPRESSION EMAILS
 # ============================================================
-def normalize_suppression_email(e):
-    if pd.isna(e): return None
-    e = str(e).strip().lower()
-    e = re.sub(r"[\"'\s]", "", e)
-    e = re.sub(r"^email[:\-]*", "", e)
-    return e
+def normalize_suppression_email(s):
+    s = s.astype("string").str.strip().str.lower()
+    s = s.str.replace(_QUOTE_WS, "", regex=True)
+    return s.str.replace(_EMAIL_PREFIX, "", regex=True)
 
 
 # ============================================================
@@ -72,19 +94,20 @@ def load_suppression_data(files):
 
     for f in files:
         try:
+            if hasattr(f, "seek"): f.seek(0)  # reruns hand back consumed uploads
             df = pd.read_csv(f, dtype=str, nrows=200000)
             found = []
 
             for c in df.columns:
                 lc = c.lower()
-                if "email" in lc:
-                    emails.update(df[c].dropna().map(normalize_suppression_email))
+                if _EMAIL_COL_RE.search(lc):
+                    emails.update(normalize_suppression_email(df[c]).dropna())
                     found.append(c)
-                elif "phone" in lc:
-                    phones.update(df[c].dropna().map(clean_phone))
+                elif _PHONE_COL_RE.search(lc):
+                    phones.update(clean_phone(df[c]).dropna())
                     found.append(c)
-                elif any(x in lc for x in ["domain", "website", "url"]):
-                    domains.update(df[c].dropna().map(clean_domain))
+                elif _DOMAIN_COL_RE.search(lc):
+                    domains.update(clean_domain(df[c]).dropna())
                     found.append(c)
 
             logs.append(f"✅ {getattr(f,'name',f)}: found {', '.join(found) if found else 'no usable columns'}")
@@ -92,150 +115,578 @@ def load_suppression_data(files):
         except Exception as e:
             logs.append(f"⚠️ {getattr(f,'name',f)} skipped: {e}")
 
-    return {"emails": emails, "phones": phones, "domains": domains, "logs": logs}
+    # Digit-only phones up to 15 digits (E.164 never exceeds that) pack
+    # into a sorted uint64 array: 8 bytes per value and binary search
+    # instead of string hashing. Leading zeros don't survive the integer
+    # round-trip, so those stay on the string index with the oddballs.
+    def _packs(p):
+        return p.isdigit() and len(p) <= 15 and not p.startswith("0")
+    phones_short = sorted(int(p) for p in phones if _packs(p))
+    phones_long = {p for p in phones if not _packs(p)}
+
+    return {
+        "emails": emails, "phones": phones, "domains": domains,
+        # Index objects build their lookup hashtable once on first probe
+        # and reuse it for every later chunk
+        "emails_idx": pd.Index(list(emails), dtype="string"),
+        "phones_idx": pd.Index(list(phones_long), dtype="string"),
+        "phones_u64": np.array(phones_short, dtype=np.uint64),
+        "domains_idx": pd.Index(list(domains), dtype="string"),
+        # one shared bloom filter over all three sets; false positives are
+        # re-checked against the exact arrays in isin_suppression
+        "bloom": build_bloom(emails, phones, domains),
+        "logs": logs,
+    }
+
+
+@st.cache_data(show_spinner=False)
+def load_suppression_cached(_files, file_digests):
+    # file_digests (content hashes) is the cache key; streamlit skips
+    # hashing the underscore-prefixed uploads themselves
+    return load_suppression_data(_files)
 
 
 # ============================================================
-# CLEAN ONE CHUNK
+# BLOOM PRE-FILTER (cheap reject before the exact hash lookup)
 # ============================================================
-def clean_chunk(df, suppression):
-    removed_email = removed_phone = removed_domain = 0
+_BLOOM_BITS_PER_VALUE = 16
 
-    # ---- Email ----
-    strict_email_col = find_col(df, ["email"])
-    fallback_email_cols = [c for c in df.columns if "email" in c.lower()]
-
-    email_cols = []
-    if strict_email_col:
-        email_cols.append(strict_email_col)
-    for c in fallback_email_cols:
-        if c not in email_cols:
-            email_cols.append(c)
-
-    for col in email_cols:
-        df["__email"] = df[col].map(clean_email)
-        before = len(df)
-        df = df[~df["__email"].isin(suppression["emails"])]
-        removed_email += before - len(df)
+def _bloom_positions(values, size):
+    vals = np.asarray(values, dtype=object)
+    h1 = pd.util.hash_array(vals, hash_key="b10000000000000f") % size
+    h2 = pd.util.hash_array(vals, hash_key="b20000000000000f") % size
+    return h1, h2
 
-    # ---- Phone ----
-    phone_cols = [c for c in df.columns if "phone" in c.lower()]
-    for col in phone_cols:
-        df["__phone"] = df[col].map(clean_phone)
-        before = len(df)
-        df = df[~df["__phone"].isin(suppression["phones"])]
-        removed_phone += before - len(df)
+def build_bloom(*value_sets):
+    values = [v for s in value_sets for v in s]
+    size = max(1024, 1 << (len(values) * _BLOOM_BITS_PER_VALUE).bit_length())
+    bits = np.zeros(size, dtype=bool)
+    if values:
+        h1, h2 = _bloom_positions(values, size)
+        bits[h1] = True
+        bits[h2] = True
+    return bits
 
-    # ---- Domain ----
-    domain_cols = [c for c in df.columns if any(x in c.lower() for x in ["domain", "website", "url"])]
-    for col in domain_cols:
-        df["__domain"] = df[col].map(clean_domain)
-        before = len(df)
-        df = df[~df["__domain"].isin(suppression["domains"])]
-        removed_domain += before - len(df)
 
-    df = df[[c for c in df.columns if not c.startswith("__")]]
+# ============================================================
+# SUPPRESSION MEMBERSHIP TEST (hash distinct values, not rows)
+# ============================================================
+def isin_suppression(values, sup_index, bloom=None):
+    # factorize is cheaper than astype("category"): no sorting, one pass
+    codes, uniques = pd.factorize(values, sort=False)
+
+    if bloom is not None and len(uniques):
+        # Bloom filter rejects the vast majority of distinct values with
+        # two cache-friendly probes; only candidates pay the exact lookup.
+        h1, h2 = _bloom_positions(uniques.to_numpy(dtype=object), len(bloom))
+        candidates = bloom[h1] & bloom[h2]
+        hit = np.zeros(len(uniques), dtype=bool)
+        if candidates.any():
+            hit[candidates] = sup_index.get_indexer_for(uniques[candidates]) != -1
+    else:
+        hit = sup_index.get_indexer_for(uniques) != -1
 
-    return df, removed_email, removed_phone, removed_domain
+    mask = np.zeros(len(values), dtype=bool)
+    valid = codes >= 0
+    mask[valid] = hit[codes[valid]]
+    return pd.Series(mask, index=values.index)
 
 
-# ============================================================
-# MEMORY-SAFE PROCESSOR
-# ============================================================
-def process_files(files_to_clean, suppression):
-    summary, logs = [], []
-    cleaned_paths = {}   # {filename: temp_path}
+def isin_phones_u64(values, sorted_u64):
+    if not len(sorted_u64):
+        return pd.Series(False, index=values.index)
 
-    total_files = len(files_to_clean)
-    global_bar = st.progress(0)
-    global_status = st.empty()
+    nums = pd.to_numeric(values, errors="coerce")
+    # leading-zero values are matched exactly on the string index instead
+    valid = (
+        nums.notna()
+        & (values.str.len() <= 15)
+        & ~values.str.startswith("0").fillna(False)
+    ).to_numpy(dtype=bool)
+    vals = nums[valid].to_numpy(dtype=np.uint64)
 
-    for file_index, uploaded in enumerate(files_to_clean, start=1):
-        global_status.write(f"Processing {uploaded.name} ({file_index}/{total_files})")
-        global_bar.progress(int((file_index - 1) / total_files * 100))
+    pos = np.searchsorted(sorted_u64, vals)
+    hit = sorted_u64[np.clip(pos, 0, len(sorted_u64) - 1)] == vals
 
-        # 1. Save uploaded file to disk
-        source_path = save_uploaded_to_disk(uploaded)
+    mask = np.zeros(len(values), dtype=bool)
+    mask[valid] = hit
+    return pd.Series(mask, index=values.index)
 
-        # 2. Temp cleaned output file
-        out_tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".csv")
-        out_path = out_tmp.name
-        out_tmp.close()
 
-        first_write = True
-        rows_before = 0
-        cols_found = []
-        removed_email_total = removed_phone_total = removed_domain_total = 0
+# ============================================================
+# CLEAN ONE CHUNK
+# ============================================================
+def clean_chunk(df, suppression):
+    email_mask = pd.Series(False, index=df.index)
+    phone_mask = pd.Series(False, index=df.index)
+    domain_mask = pd.Series(False, index=df.index)
 
-        # Per-file progress
-        file_bar = st.progress(0)
-        file_status = st.empty()
-        chunk_counter = 0
+    # Lowercase each column name once, then classify
+    lc_cols = [(c, c.lower()) for c in df.columns]
+    email_cols = [c for c, lc in lc_cols if _EMAIL_COL_RE.search(lc)]
+    phone_cols = [c for c, lc in lc_cols if _PHONE_COL_RE.search(lc)]
+    domain_cols = [c for c, lc in lc_cols if _DOMAIN_COL_RE.search(lc)]
 
-        try:
-            for chunk in pd.read_csv(
-                source_path,
-                dtype=str,
-                chunksize=CHUNK_SIZE,
-                sep=",",
-                engine="python",
-                on_bad_lines="skip"
-            ):
-                chunk_counter += 1
-                rows_before += len(chunk)
-
-                # Identify columns
-                for c in chunk.columns:
-                    lc = c.lower()
-                    if "email" in lc: cols_found.append(c)
-                    if "phone" in lc: cols_found.append(c)
-                    if any(x in lc for x in ["domain", "website", "url"]): cols_found.append(c)
+    # Columns that are all-NaN in this chunk (and categories with nothing
+    # to suppress) skip the clean + lookup entirely.
 
-                cleaned, rem_e, rem_p, rem_d = clean_chunk(chunk, suppression)
+    # ---- Email ----
+    if len(suppression["emails_idx"]):
+        for col in email_cols:
+            if not df[col].notna().any(): continue
+            email_mask |= isin_suppression(clean_email(df[col]), suppression["emails_idx"], suppression["bloom"])
 
-                removed_email_total += rem_e
-                removed_phone_total += rem_p
-                removed_domain_total += rem_d
+    # ---- Phone ----
+    if len(suppression["phones_u64"]) or len(suppression["phones_idx"]):
+        for col in phone_cols:
+            if not df[col].notna().any(): continue
+            cleaned_phone = clean_phone(df[col])
+            phone_mask |= isin_phones_u64(cleaned_phone, suppression["phones_u64"])
+            if len(suppression["phones_idx"]):
+                phone_mask |= isin_suppression(cleaned_phone, suppression["phones_idx"], suppression["bloom"])
 
-                cleaned.to_csv(out_path, index=False, mode="a", header=first_write)
-                first_write = False
+    # ---- Domain ----
+    if len(suppression["domains_idx"]):
+        for col in domain_cols:
+            if not df[col].notna().any(): continue
+            domain_mask |= isin_suppression(clean_domain(df[col]), suppression["domains_idx"], suppression["bloom"])
 
-                # update chunk progress
-                file_bar.progress(min(100, chunk_counter * 5))
-                file_status.write(f"{uploaded.name}: processed {chunk_counter} chunks…")
+    # Count each removed row once, in email > phone > domain priority,
+    # then slice the frame a single time.
+    removed_email = int(email_mask.sum())
+    removed_phone = int((phone_mask & ~email_mask).sum())
+    removed_domain = int((domain_mask & ~email_mask & ~phone_mask).sum())
 
-                del chunk, cleaned
-                gc.collect()
+    df = df.loc[~(email_mask | phone_mask | domain_mask)]
 
-            total_removed = removed_email_total + removed_phone_total + removed_domain_total
-            rows_after = rows_before - total_removed
+    return df, removed_email, removed_phone, removed_domain
 
-            logs.append(f"✔ {uploaded.name}: removed {total_removed} rows")
 
-            summary.append({
-                "File": uploaded.name,
-                "Identified Columns": ", ".join(sorted(set(cols_found))) or "None",
-                "Rows Before": rows_before,
-                "Rows After": rows_after,
-                "Removed by Email": removed_email_total,
-                "Removed by Phone": removed_phone_total,
-                "Removed by Domain": removed_domain_total,
-                "Total Removed": total_removed
-            })
+# ============================================================
+# CHUNKED CSV READER (Arrow fast path, python-engine fallback)
+# ============================================================
+def _prefetch(chunks, depth=2):
+    """Pull chunks on a background thread so the next read overlaps cleaning."""
+    q = queue.Queue(maxsize=depth)
+    done = object()
+
+    def pump():
+        try:
+            for chunk in chunks:
+                q.put(chunk)
+            q.put(done)
+        except BaseException as e:
+            q.put(e)
+
+    threading.Thread(target=pump, daemon=True).start()
+    while True:
+        item = q.get()
+        if item is done:
+            return
+        if isinstance(item, BaseException):
+            raise item
+        yield item
+
+
+def iter_csv_chunks(source_path):
+    try:
+        header = pd.read_csv(source_path, nrows=0).columns
+
+        # Everything is read as text so values round-trip unchanged, but only
+        # the match columns need to be regular strings for the cleaning
+        # kernels; the untouched rest ride through as large_string.
+        column_types = {}
+        for c in header:
+            lc = c.lower()
+            if _EMAIL_COL_RE.search(lc) or _PHONE_COL_RE.search(lc) or _DOMAIN_COL_RE.search(lc):
+                column_types[c] = pa.string()
+            else:
+                column_types[c] = pa.large_string()
+
+        reader = pacsv.open_csv(
+            source_path,
+            read_options=pacsv.ReadOptions(block_size=64 << 20),
+            parse_options=pacsv.ParseOptions(invalid_row_handler=lambda row: "skip"),
+            convert_options=pacsv.ConvertOptions(column_types=column_types),
+        )
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError, UnicodeDecodeError):
+        reader = None
+
+    if reader is not None:
+        for batch in reader:
+            # ArrowDtype keeps the strings in Arrow buffers instead of
+            # exploding them into per-cell Python objects
+            yield batch.to_pandas(types_mapper=pd.ArrowDtype)
+        return
+
+    # Slow but forgiving parser for files Arrow refuses to open.
+    # Size chunks from a sample so each lands near the Arrow block size
+    # (~64MB) instead of a fixed row count that ignores row width.
+    chunk_rows = CHUNK_SIZE
+    try:
+        sample = pd.read_csv(source_path, dtype=str, nrows=1000, sep=",",
+                             engine="python", on_bad_lines="skip")
+        if len(sample):
+            row_bytes = max(1, int(sample.memory_usage(deep=True).sum()) // len(sample))
+            chunk_rows = max(10_000, min(200_000, (64 << 20) // row_bytes))
+    except Exception:
+        pass
+
+    for chunk in pd.read_csv(
+        source_path,
+        dtype=str,
+        dtype_backend="pyarrow",
+        chunksize=chunk_rows,
+        sep=",",
+        engine="python",
+        on_bad_lines="skip"
+    ):
+        yield chunk
+
+
+def _open_batch_writer(out_path, schema, parquet):
+    if parquet:
+        return pq.ParquetWriter(out_path, schema, compression="snappy")
+    return pacsv.CSVWriter(out_path, schema)
 
-            cleaned_paths[uploaded.name] = out_path
 
+# ============================================================
+# PER-FILE WORKER (runs in a separate process)
+# ============================================================
+_WORKER_SUPPRESSION = None
+
+def _init_worker(suppression):
+    global _WORKER_SUPPRESSION
+    _WORKER_SUPPRESSION = suppression
+
+def _clean_one_file(name, source_path, out_format="csv"):
+    suppression = _WORKER_SUPPRESSION
+
+    parquet = out_format == "parquet"
+    out_name = os.path.splitext(name)[0] + ".parquet" if parquet else name
+
+    # Temp cleaned output file
+    out_tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".parquet" if parquet else ".csv")
+    out_path = out_tmp.name
+    out_tmp.close()
+
+    # Cleaned batches are held in memory and written once at the end; if
+    # they outgrow the budget, spill everything to a streaming writer.
+    writer = None
+    batches = []
+    buffered = 0
+    rows_before = 0
+    cols_found = []
+    chunk_errors = []
+    removed_email_total = removed_phone_total = removed_domain_total = 0
+
+    try:
+        # Identify columns once from the header; all chunks share it
+        for c in pd.read_csv(source_path, nrows=0).columns:
+            lc = c.lower()
+            if _EMAIL_COL_RE.search(lc) or _PHONE_COL_RE.search(lc) or _DOMAIN_COL_RE.search(lc):
+                cols_found.append(c)
+
+        for i, chunk in enumerate(_prefetch(iter_csv_chunks(source_path))):
+            # One bad chunk should not sink the whole file; skip and report it
+            try:
+                cleaned, rem_e, rem_p, rem_d = clean_chunk(chunk, suppression)
+                batch = pa.RecordBatch.from_pandas(cleaned, preserve_index=False)
+            except Exception as e:
+                chunk_errors.append(f"chunk {i} in {name} failed: {e}")
+                continue
+
+            rows_before += len(chunk)
+            removed_email_total += rem_e
+            removed_phone_total += rem_p
+            removed_domain_total += rem_d
+
+            if writer is None and buffered + batch.nbytes <= OUTPUT_BUFFER_BUDGET:
+                batches.append(batch)
+                buffered += batch.nbytes
+            else:
+                if writer is None:
+                    writer = _open_batch_writer(out_path, batch.schema, parquet)
+                    for b in batches:
+                        writer.write_batch(b)
+                    batches, buffered = [], 0
+                writer.write_batch(batch)
+
+        if writer is None and batches:
+            # Everything fit: one write instead of per-chunk appends
+            table = pa.Table.from_batches(batches)
+            if parquet:
+                pq.write_table(table, out_path, compression="snappy")
+            else:
+                pacsv.write_csv(table, out_path)
+
+        return {
+            "name": name,
+            "out_name": out_name,
+            "out_path": out_path,
+            "rows_before": rows_before,
+            "cols_found": cols_found,
+            "removed_email": removed_email_total,
+            "removed_phone": removed_phone_total,
+            "removed_domain": removed_domain_total,
+            "chunk_errors": chunk_errors,
+            "error": None,
+        }
+
+    except Exception as e:
+        return {"name": name, "out_path": None, "error": str(e)}
+
+    finally:
+        if writer is not None:
+            writer.close()
+        # clean up uploaded temp file
+        try: os.remove(source_path)
+        except: pass
+        gc.collect()  # once per file, not per chunk
+
+
+def _clean_chunk_worker(chunk):
+    cleaned, rem_e, rem_p, rem_d = clean_chunk(chunk, _WORKER_SUPPRESSION)
+    batch = pa.RecordBatch.from_pandas(cleaned, preserve_index=False)
+    return batch, len(chunk), rem_e, rem_p, rem_d
+
+
+def _clean_one_file_parallel(name, source_path, ex, out_format="csv"):
+    """Single-file run: spread the chunks over the pool instead of the files.
+
+    Runs in the main process; reading and writing stay here while
+    clean_chunk fans out to the workers. Chunk order is not preserved,
+    which is fine for a row filter.
+    """
+    parquet = out_format == "parquet"
+    out_name = os.path.splitext(name)[0] + ".parquet" if parquet else name
+
+    out_tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".parquet" if parquet else ".csv")
+    out_path = out_tmp.name
+    out_tmp.close()
+
+    writer = None
+    batches = []
+    buffered = 0
+    rows_before = 0
+    cols_found = []
+    chunk_errors = []
+    chunk_ids = {}  # future -> chunk number, for error reporting
+    totals = {"email": 0, "phone": 0, "domain": 0}
+    window = (os.cpu_count() or 1) * 2  # bound the chunks in flight
+
+    def consume(fut):
+        nonlocal writer, batches, buffered, rows_before
+        try:
+            batch, n_rows, rem_e, rem_p, rem_d = fut.result()
         except Exception as e:
-            logs.append(f"⚠️ {uploaded.name} failed: {e}")
+            chunk_errors.append(f"chunk {chunk_ids.pop(fut)} in {name} failed: {e}")
+            return
+        chunk_ids.pop(fut, None)
+        rows_before += n_rows
+        totals["email"] += rem_e
+        totals["phone"] += rem_p
+        totals["domain"] += rem_d
+        if writer is None and buffered + batch.nbytes <= OUTPUT_BUFFER_BUDGET:
+            batches.append(batch)
+            buffered += batch.nbytes
+        else:
+            if writer is None:
+                writer = _open_batch_writer(out_path, batch.schema, parquet)
+                for b in batches:
+                    writer.write_batch(b)
+                batches, buffered = [], 0
+            writer.write_batch(batch)
+
+    try:
+        for c in pd.read_csv(source_path, nrows=0).columns:
+            lc = c.lower()
+            if _EMAIL_COL_RE.search(lc) or _PHONE_COL_RE.search(lc) or _DOMAIN_COL_RE.search(lc):
+                cols_found.append(c)
+
+        pending = set()
+        for i, chunk in enumerate(_prefetch(iter_csv_chunks(source_path))):
+            fut = ex.submit(_clean_chunk_worker, chunk)
+            chunk_ids[fut] = i
+            pending.add(fut)
+            if len(pending) >= window:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    consume(fut)
+        for fut in as_completed(pending):
+            consume(fut)
+
+        if writer is None and batches:
+            table = pa.Table.from_batches(batches)
+            if parquet:
+                pq.write_table(table, out_path, compression="snappy")
+            else:
+                pacsv.write_csv(table, out_path)
+
+        return {
+            "name": name,
+            "out_name": out_name,
+            "out_path": out_path,
+            "rows_before": rows_before,
+            "cols_found": cols_found,
+            "removed_email": totals["email"],
+            "removed_phone": totals["phone"],
+            "removed_domain": totals["domain"],
+            "chunk_errors": chunk_errors,
+            "error": None,
+        }
+
+    except Exception as e:
+        return {"name": name, "out_path": None, "error": str(e)}
+
+    finally:
+        if writer is not None:
+            writer.close()
+        try: os.remove(source_path)
+        except: pass
+        gc.collect()
+
 
-        finally:
-            # clean up uploaded temp file
-            try: os.remove(source_path)
-            except: pass
+# ============================================================
+# MEMORY-SAFE PROCESSOR (one worker process per file)
+# ============================================================
+_RESULT_CACHE_MAX = 32  # entries; oldest evicted and its output unlinked
+
+@st.cache_resource(show_spinner=False)
+def _result_cache():
+    # Streamlit re-executes this script in a fresh namespace on every
+    # rerun, so a module-level dict is reborn empty each click; a
+    # cache_resource singleton survives for the life of the process.
+    # {(file name, content digest, suppression digest, format): worker result}
+    return {}
+
+def _cache_store(key, result):
+    # Only fully clean runs are worth reusing: caching a failure would make
+    # a transient error permanent, and a run with skipped chunks would
+    # re-serve its partial output.
+    if result["error"] is not None or result.get("chunk_errors"):
+        return
+    cache = _result_cache()
+    cache.pop(key, None)  # re-insert at the end (most recent)
+    cache[key] = result
+
+def _cache_evict(keep=()):
+    # Drop oldest entries past the cap, but never ones the current run is
+    # about to zip up
+    cache = _result_cache()
+    while len(cache) > _RESULT_CACHE_MAX:
+        old_key = next((k for k in cache if k not in keep), None)
+        if old_key is None:
+            break
+        old = cache.pop(old_key)
+        try: os.remove(old["out_path"])
+        except OSError: pass
+
+def _suppression_digest(suppression):
+    h = hashlib.blake2b()
+    for key in ("emails", "phones", "domains"):
+        for v in sorted(suppression[key]):
+            h.update(v.encode())
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def summary_to_csv(rows):
+    # plain csv module: no pandas dtype inference for a handful of rows
+    buf = io.StringIO()
+    if rows:
+        w = csv.DictWriter(buf, fieldnames=list(rows[0].keys()))
+        w.writeheader()
+        w.writerows(rows)
+    return buf.getvalue()
+
+
+def process_files(files_to_clean, suppression, out_format="csv"):
+    summary, logs = [], []
+    cleaned_paths = {}   # {filename: temp_path}
+
+    total_files = len(files_to_clean)
+    global_bar = st.progress(0)
+    global_status = st.empty()
 
+    sup_key = _suppression_digest(suppression)
+
+    # Reuse cached outputs for inputs we've already cleaned this session;
+    # spool the rest to disk in the main process (workers only get paths)
+    cache = _result_cache()
+    order, jobs, results = [], [], {}
+    for uploaded in files_to_clean:
+        digest = hashlib.blake2b(uploaded.getbuffer()).hexdigest()
+        key = (uploaded.name, digest, sup_key, out_format)
+        order.append((uploaded.name, key))
+
+        cached = cache.get(key)
+        if cached is not None and os.path.exists(cached["out_path"]):
+            cache[key] = cache.pop(key)  # refresh recency
+            results[uploaded.name] = cached
+        else:
+            jobs.append((uploaded.name, save_uploaded_to_disk(uploaded)))
+
+    # One file can't use per-file parallelism; spread its chunks instead
+    chunk_parallel = len(jobs) == 1
+
+    done = total_files - len(jobs)
+    last_pct = 0
+    if jobs:
+        with ProcessPoolExecutor(
+            max_workers=(os.cpu_count() or 1) if chunk_parallel else min(len(jobs), os.cpu_count() or 1),
+            mp_context=multiprocessing.get_context("fork"),  # streamlit scripts aren't importable by spawn
+            initializer=_init_worker,
+            initargs=(suppression,),  # sent once per worker, not per file
+        ) as ex:
+            if chunk_parallel:
+                name, path = jobs[0]
+                global_status.write(f"Processing {name} ({done + 1}/{total_files})")
+                results[name] = _clean_one_file_parallel(name, path, ex, out_format)
+            else:
+                futures = {ex.submit(_clean_one_file, name, path, out_format): name for name, path in jobs}
+                for fut in as_completed(futures):
+                    result = fut.result()
+                    results[result["name"]] = result
+                    done += 1
+                    global_status.write(f"Processed {result['name']} ({done}/{total_files})")
+                    # only redraw the bar when the visible percentage moves
+                    pct = int(done / total_files * 100)
+                    if pct != last_pct:
+                        global_bar.progress(pct)
+                        last_pct = pct
+
+    # Report in upload order, not completion order
+    for name, key in order:
+        result = results[name]
+        _cache_store(key, result)
+        if result["error"] is not None:
+            logs.append(f"⚠️ {name} failed: {result['error']}")
+            continue
+
+        for msg in result.get("chunk_errors") or []:
+            logs.append(f"⚠️ {msg}")
+
+        total_removed = result["removed_email"] + result["removed_phone"] + result["removed_domain"]
+        logs.append(f"✔ {name}: removed {total_removed} rows")
+
+        summary.append({
+            "File": name,
+            "Identified Columns": ", ".join(dict.fromkeys(result["cols_found"])) or "None",
+            "Rows Before": result["rows_before"],
+            "Rows After": result["rows_before"] - total_removed,
+            "Removed by Email": result["removed_email"],
+            "Removed by Phone": result["removed_phone"],
+            "Removed by Domain": result["removed_domain"],
+            "Total Removed": total_removed
+        })
+
+        cleaned_paths[result["out_name"]] = result["out_path"]
+
+    _cache_evict(keep={key for _, key in order})
     global_bar.progress(100)
     global_status.write("All files processed.")
-    return pd.DataFrame(summary), logs, cleaned_paths
+    return summary, logs, cleaned_paths
 
 
 # ============================================================
@@ -250,6 +701,12 @@ sup_files = st.file_uploader("Upload suppression CSV files", type="csv", accept_
 st.subheader("2️⃣ Upload Files to Clean")
 clean_files = st.file_uploader("Upload CSV files to clean", type="csv", accept_multiple_files=True)
 
+st.subheader("3️⃣ Output Format")
+out_choice = st.radio("Cleaned file format", ["CSV", "Parquet (smaller & faster)"], horizontal=True)
+out_format = "parquet" if out_choice.startswith("Parquet") else "csv"
+zip_choice = st.radio("ZIP compression", ["Fast (store)", "Smaller (deflate)"], horizontal=True)
+zip_method = ZIP_DEFLATED if zip_choice.startswith("Smaller") else ZIP_STORED
+
 if st.button("Run Cleaning"):
     if not sup_files or not clean_files:
         st.error("Please upload both suppression and cleaning files.")
@@ -257,36 +714,49 @@ if st.button("Run Cleaning"):
         start = datetime.now()
 
         st.info("Loading suppression data…")
-        suppression = load_suppression_data(sup_files)
+        sup_digests = tuple(hashlib.md5(f.getvalue()).hexdigest() for f in sup_files)
+        suppression = load_suppression_cached(sup_files, sup_digests)
         for log in suppression["logs"]: st.write(log)
 
         st.info("Processing files…")
-        summary_df, logs, cleaned_paths = process_files(clean_files, suppression)
+        summary_rows, logs, cleaned_paths = process_files(clean_files, suppression, out_format)
         for log in logs: st.write(log)
 
-        # Build ZIP from disk (memory-safe)
+        # Build ZIP on disk so RAM stays flat (cleaned files never load into memory)
         st.info("Preparing ZIP…")
-        zip_buffer = io.BytesIO()
-        with ZipFile(zip_buffer, "w") as zf:
-            for name, path in cleaned_paths.items():
-                zf.write(path, arcname=name)
-            zf.writestr("_Cleaning_Summary.csv", summary_df.to_csv(index=False))
-
-        zip_buffer.seek(0)
+        zip_tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".zip")
+        zip_path = zip_tmp.name
+        zip_tmp.close()
 
-        # Cleanup cleaned files
+        # compresslevel only applies to deflate; level 1 keeps it near I/O speed
+        with ZipFile(zip_path, "w", compression=zip_method, compresslevel=1) as zf:
+            for name, path in cleaned_paths.items():
+                # stream in 1MB pieces; force_zip64 keeps >4GB entries legal
+                with open(path, "rb") as src, zf.open(name, "w", force_zip64=True) as dst:
+                    shutil.copyfileobj(src, dst, 1 << 20)
+            zf.writestr("_Cleaning_Summary.csv", summary_to_csv(summary_rows))
+
+        # Outputs the cache kept are re-served on identical reruns; anything
+        # it declined (errors, partial files) or already evicted is deleted
+        # now that the ZIP holds a copy
+        retained = {r["out_path"] for r in _result_cache().values()}
         for p in cleaned_paths.values():
-            try: os.remove(p)
-            except: pass
+            if p not in retained:
+                try: os.remove(p)
+                except OSError: pass
 
         st.subheader("📊 Summary")
-        st.dataframe(summary_df)
-
-        st.download_button(
-            "⬇️ Download Cleaned Files (ZIP)",
-            data=zip_buffer,
-            file_name="Cleaned_Files.zip",
-            mime="application/zip"
-        )
+        st.dataframe(pd.DataFrame(summary_rows))
+
+        with open(zip_path, "rb") as fh:
+            st.download_button(
+                "⬇️ Download Cleaned Files (ZIP)",
+                data=fh,
+                file_name="Cleaned_Files.zip",
+                mime="application/zip"
+            )
+
+        try: os.remove(zip_path)
+        except: pass
 
         st.success(f"✨ Cleaning complete! Total time: {datetime.now() - start}")